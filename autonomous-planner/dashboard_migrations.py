@@ -0,0 +1,164 @@
+"""One-time database setup for the Session Analysis Dashboard.
+
+Run once, and again after upgrading, with a role that may create objects in
+the dashboard database:
+
+    python dashboard_migrations.py
+
+Without pg_cron, refresh the Overview view with the same role:
+
+    python dashboard_migrations.py --refresh
+
+The dashboard itself never runs DDL. Until these objects exist, the Overview
+page reads the base tables directly.
+"""
+import sys
+
+import psycopg
+
+from db_config import DATABASE_URL
+
+# Overview counters; the dashboard runs this directly until the view exists
+DASHBOARD_SUMMARY_QUERY = """
+    SELECT 1 AS singleton,
+           (SELECT COUNT(*) FROM raw_session_metadata) AS total_sessions,
+           (SELECT COUNT(*) FROM session_analysis_results) AS total_analysis,
+           (SELECT MAX(last_updated) FROM ingestion_state) AS last_updated
+"""
+
+# Precomputed read models for the Overview page
+DASHBOARD_SCHEMA = [
+    "CREATE MATERIALIZED VIEW IF NOT EXISTS mv_dashboard_summary AS" + DASHBOARD_SUMMARY_QUERY,
+    "CREATE UNIQUE INDEX IF NOT EXISTS mv_dashboard_summary_singleton ON mv_dashboard_summary (singleton)",
+]
+
+# Per-project session counts, kept current by a trigger instead of a refresh.
+# Applied in one transaction with raw_session_metadata locked against writes,
+# so no row lands between the recount and the trigger going live.
+PROJECT_COUNTS_SCHEMA = [
+    "LOCK TABLE raw_session_metadata IN SHARE ROW EXCLUSIVE MODE",
+    """
+    CREATE TABLE IF NOT EXISTS project_session_counts (
+        projectid text PRIMARY KEY,
+        count bigint NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS project_session_counts_count ON project_session_counts (count DESC)",
+    """
+    CREATE OR REPLACE FUNCTION bump_project_count() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.projectid IS NOT NULL THEN
+            UPDATE project_session_counts SET count = count - 1
+            WHERE projectid = OLD.projectid;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.projectid IS NOT NULL THEN
+            INSERT INTO project_session_counts (projectid, count) VALUES (NEW.projectid, 1)
+            ON CONFLICT (projectid) DO UPDATE SET count = project_session_counts.count + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    # DROP + CREATE rather than CREATE OR REPLACE TRIGGER, which needs PG14+
+    "DROP TRIGGER IF EXISTS raw_session_metadata_project_count ON raw_session_metadata",
+    """
+    CREATE TRIGGER raw_session_metadata_project_count
+    AFTER INSERT OR DELETE OR UPDATE OF projectid ON raw_session_metadata
+    FOR EACH ROW EXECUTE FUNCTION bump_project_count()
+    """,
+    # Recount from scratch; exact because writers are blocked until commit
+    "DELETE FROM project_session_counts",
+    """
+    INSERT INTO project_session_counts (projectid, count)
+    SELECT projectid, COUNT(*)
+    FROM raw_session_metadata
+    WHERE projectid IS NOT NULL
+    GROUP BY projectid
+    """,
+]
+
+# Periodic refresh needs pg_cron, which may not be installed
+DASHBOARD_SCHEDULES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_cron",
+    """
+    SELECT cron.schedule('refresh_mv_dashboard_summary', '*/5 * * * *',
+                         'REFRESH MATERIALIZED VIEW CONCURRENTLY mv_dashboard_summary')
+    """,
+]
+
+# Views the dashboard reads; refreshing one requires owning it
+DASHBOARD_VIEWS = ["mv_dashboard_summary"]
+
+# Indexes backing the Sessions Browser filters; trigram search needs pg_trgm
+SESSIONS_BROWSER_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS raw_session_metadata_created_at ON raw_session_metadata (created_at DESC)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX IF NOT EXISTS raw_session_metadata_title_trgm
+    ON raw_session_metadata USING gin (title gin_trgm_ops)
+    """,
+]
+
+# Index backing the per-session lookups on the Session Details page
+SESSION_DETAILS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_sar_session ON session_analysis_results (session_id)",
+]
+
+
+def execute_statements(statements, required=True):
+    """Run DDL statements one by one on a dedicated autocommit connection.
+
+    With required=False a failing statement is reported and skipped; the
+    number skipped is returned.
+    """
+    skipped = 0
+    with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        for statement in statements:
+            try:
+                conn.execute(statement)
+            except psycopg.Error as e:
+                if required:
+                    raise
+                skipped += 1
+                print(f"Skipped: {' '.join(statement.split())}\n  {e}", file=sys.stderr)
+    return skipped
+
+
+def execute_transaction(statements):
+    """Run statements in a single transaction, rolling back if any fails"""
+    with psycopg.connect(DATABASE_URL) as conn, conn.transaction():
+        for statement in statements:
+            conn.execute(statement)
+
+
+def migrate():
+    """Create the dashboard read models, indexes and refresh schedule.
+
+    Returns the number of optional statements that could not be applied.
+    """
+    execute_statements(DASHBOARD_SCHEMA)
+    execute_transaction(PROJECT_COUNTS_SCHEMA)
+    execute_statements(SESSION_DETAILS_INDEXES)
+    skipped = execute_statements(DASHBOARD_SCHEDULES, required=False)
+    skipped += execute_statements(SESSIONS_BROWSER_INDEXES, required=False)
+    return skipped
+
+
+def refresh():
+    """Refresh the dashboard materialized views immediately"""
+    execute_statements(
+        [f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}" for view in DASHBOARD_VIEWS]
+    )
+
+
+if __name__ == "__main__":
+    if "--refresh" in sys.argv[1:]:
+        refresh()
+        print("Dashboard views refreshed")
+    else:
+        skipped = migrate()
+        if skipped:
+            print(f"Dashboard schema applied; {skipped} optional statement(s) skipped")
+        else:
+            print("Dashboard schema is up to date")
@@ -0,0 +1,12 @@
+# Database configuration shared by the dashboard and its migrations
+DB_CONFIG = {
+    "host": "localhost",
+    "port": 5432,
+    "database": "autonomous_planner",
+    "user": "agentzero",
+    "password": "",
+}
+
+# Shared DSN for psycopg and connectorx (omit the password when local trust auth is used)
+_DB_AUTH = DB_CONFIG["user"] + (f":{DB_CONFIG['password']}" if DB_CONFIG["password"] else "")
+DATABASE_URL = f"postgresql://{_DB_AUTH}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
@@ -1,30 +1,21 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
-import psycopg2.extras
-from datetime import datetime
+import psycopg
+from psycopg_pool import ConnectionPool
+from datetime import datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
-import json
-from sqlalchemy import create_engine
+from plotly.subplots import make_subplots
+import numpy as np
+import connectorx as cx
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
-# Database configuration
-DB_CONFIG = {
-    "host": "localhost",
-    "port": 5432,
-    "database": "autonomous_planner",
-    "user": "agentzero",
-    "password": "",
-}
+from db_config import DATABASE_URL
+from dashboard_migrations import DASHBOARD_SUMMARY_QUERY
 
-# SQLAlchemy engine for pandas compatibility
-DATABASE_URL = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-
-
-@st.cache_resource
-def get_sqlalchemy_engine():
-    """Create SQLAlchemy engine for pandas compatibility"""
-    return create_engine(DATABASE_URL)
+# Number of parallel connections connectorx uses for partitioned loads
+CX_PARTITIONS = 4
 
 
 # Page configuration
@@ -61,123 +52,277 @@ st.markdown(
 )
 
 
-import psycopg2.pool
+# Seconds to wait for the database before reporting it unreachable
+POOL_TIMEOUT_SECONDS = 5
 
 
 # Database connection pool
 @st.cache_resource
+def _open_connection_pool():
+    """Open the pool and wait for its first connections; failures are not cached"""
+    pool = ConnectionPool(
+        conninfo=DATABASE_URL,
+        min_size=2,
+        max_size=10,
+        max_idle=300,
+        timeout=POOL_TIMEOUT_SECONDS,
+        open=True,
+    )
+    try:
+        pool.wait(timeout=POOL_TIMEOUT_SECONDS)
+    except Exception:
+        pool.close()
+        raise
+    return pool
+
+
 def get_connection_pool():
     """Create connection pool for database access"""
     try:
-        pool = psycopg2.pool.SimpleConnectionPool(minconn=1, maxconn=5, **DB_CONFIG)
-        return pool
+        return _open_connection_pool()
     except Exception as e:
         st.error(f"Connection pool creation failed: {e}")
         return None
 
 
-def get_db_connection():
-    """Get connection from pool"""
+# Maximum rows returned to the Sessions Browser for one filter
+SESSIONS_BROWSER_LIMIT = 5000
+
+# In-memory loader results stay this long; Refresh Data clears every cache early
+CACHE_TTL_SECONDS = 300
+
+# The base-table loaders are persisted to disk so they survive restarts, keyed
+# on data_version() instead of a ttl. Bump when their SQL or result shape changes.
+CACHE_SCHEMA_VERSION = 1
+
+# How often to check ingestion_state for new data
+DATA_VERSION_TTL_SECONDS = 30
+
+
+def _ilike_pattern(term):
+    """Build an ILIKE pattern matching term literally anywhere in the value"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _bind_params(query, params):
+    """Inline query parameters with psycopg quoting, since connectorx takes plain SQL"""
+    if not params:
+        return query
     pool = get_connection_pool()
     if not pool:
-        return None
+        raise RuntimeError("No database connection available")
+    with pool.connection() as conn:
+        return psycopg.ClientCursor(conn).mogrify(query, params)
+
+
+@st.cache_data(ttl=DATA_VERSION_TTL_SECONDS, show_spinner=False)
+def _fetch_last_ingested():
+    """Latest ingestion_state update, which moves whenever the agents write data"""
+    pool = get_connection_pool()
+    if not pool:
+        raise RuntimeError("No database connection available")
+    with pool.connection() as conn:
+        return conn.execute("SELECT MAX(last_updated) FROM ingestion_state").fetchone()[0]
+
+
+@st.cache_resource
+def _data_version_state():
+    """Process-wide record of the data version the persisted loaders were cleared for"""
+    return {"version": None}
+
+
+def data_version():
+    """Cache key for the persisted loaders; changes with the schema version and new data"""
+    version = (CACHE_SCHEMA_VERSION, _fetch_last_ingested())
+    state = _data_version_state()
+    if state["version"] != version:
+        if state["version"] is not None:
+            # Drop the superseded entries from disk
+            for loader in (_load_sessions_data, _load_analysis_data, _load_session_analysis):
+                loader.clear()
+        state["version"] = version
+    return version
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS)
+def get_session_date_bounds():
+    """Get the earliest and latest session creation times"""
+    pool = get_connection_pool()
+    if not pool:
+        return None, None
+
     try:
-        conn = pool.getconn()
-        return conn
+        with pool.connection() as conn:
+            return conn.execute(
+                "SELECT MIN(created_at), MAX(created_at) FROM raw_session_metadata"
+            ).fetchone()
     except Exception as e:
-        st.error(f"Failed to get connection from pool: {e}")
-        return None
-
+        st.error(f"Error loading session date range: {e}")
+        return None, None
+
+
+# Persisted loaders raise on failure so an error result is never written to
+# disk; the public wrappers below report it and return an empty frame.
+
+
+@st.cache_data(persist="disk", show_spinner=False)
+def _load_sessions_data(data_version, start=None, end=None, search=None):
+    conditions, params = [], []
+    if start is not None:
+        conditions.append("created_at >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("created_at < %s")
+        params.append(end)
+    if search:
+        conditions.append("title ILIKE %s")
+        params.append(_ilike_pattern(search))
+
+    query = """
+    SELECT session_id, title, created_at, updated_at, projectid, directory,
+           files, additions, deletions
+    FROM raw_session_metadata
+    """
+    if conditions:
+        query += f"WHERE {' AND '.join(conditions)}\n"
+    query += "ORDER BY created_at DESC\n"
+    if conditions:
+        query += f"LIMIT {SESSIONS_BROWSER_LIMIT}\n"
 
-def return_connection(conn):
-    """Return connection to pool"""
-    if conn:
-        pool = get_connection_pool()
-        if pool:
-            try:
-                pool.putconn(conn)
-            except Exception:
-                pass  # Pool might be closed
+    # Arrow result wrapped without per-row Python objects
+    table = cx.read_sql(DATABASE_URL, _bind_params(query, params), return_type="arrow")
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
 
 
-@st.cache_data(ttl=300)
-def load_sessions_data():
-    """Load all session metadata"""
-    engine = get_sqlalchemy_engine()
+def load_sessions_data(start=None, end=None, search=None):
+    """Load session metadata, optionally filtered by creation time and title"""
     try:
-        query = """
-        SELECT session_id, title, created_at, updated_at, projectid, directory,
-               files, additions, deletions
-        FROM raw_session_metadata
-        ORDER BY created_at DESC
-        """
-        df = pd.read_sql_query(query, engine)
-        return df
+        return _load_sessions_data(data_version(), start, end, search)
     except Exception as e:
         st.error(f"Error loading sessions data: {e}")
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=300)
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def encode_sessions_csv(start=None, end=None, search=None):
+    """Encode a Sessions Browser result as CSV, once per filter combination"""
+    df = load_sessions_data(start, end, search)
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+    return buf.getvalue().to_pybytes()
+
+
+@st.cache_data(persist="disk", show_spinner=False)
+def _load_analysis_data(data_version):
+    # Synthetic integer key so connectorx can split the scan across connections
+    query = f"""
+    SELECT session_id, analysis_type, metric_name,
+           metric_value #>> '{{}}' AS metric_value,
+           abs(hashtext(session_id) % {CX_PARTITIONS}) AS partition_key
+    FROM session_analysis_results
+    """
+    df = cx.read_sql(
+        DATABASE_URL,
+        query,
+        return_type="pandas",
+        partition_on="partition_key",
+        partition_num=CX_PARTITIONS,
+    )
+    return df.drop(columns="partition_key")
+
+
 def load_analysis_data():
     """Load all analysis results"""
-    engine = get_sqlalchemy_engine()
     try:
-        query = """
-        SELECT session_id, analysis_type, metric_name, metric_value
-        FROM session_analysis_results
-        """
-        df = pd.read_sql_query(query, engine)
-        return df
+        return _load_analysis_data(data_version())
     except Exception as e:
         st.error(f"Error loading analysis data: {e}")
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=300)
+@st.cache_data(persist="disk", show_spinner=False)
+def _load_session_analysis(data_version, session_id):
+    pool = get_connection_pool()
+    if not pool:
+        raise RuntimeError("No database connection available")
+
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT analysis_type, metric_name, metric_value #>> '{}' AS metric_value
+            FROM session_analysis_results
+            WHERE session_id = %s
+            """,
+            (session_id,),
+        )
+        columns = [column.name for column in cursor.description]
+        return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+
+def load_session_analysis(session_id):
+    """Load analysis results for a single session"""
+    try:
+        return _load_session_analysis(data_version(), session_id)
+    except Exception as e:
+        st.error(f"Error loading analysis data for session: {e}")
+        return pd.DataFrame()
+
+
+def _fetch_read_model(conn, query, fallback):
+    """Query a dashboard read model, or the base tables if it has not been migrated yet"""
+    try:
+        with conn.transaction():
+            return conn.execute(query).fetchall()
+    except psycopg.errors.UndefinedTable:
+        return conn.execute(fallback).fetchall()
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS)
 def get_summary_stats():
     """Get summary statistics for dashboard"""
-    conn = get_db_connection()
-    if not conn:
+    pool = get_connection_pool()
+    if not pool:
         return {}
 
     try:
         stats = {}
 
-        # Total sessions
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT COUNT(*) FROM raw_session_metadata")
-            stats["total_sessions"] = cursor.fetchone()[0]
-
-        # Total analysis records
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT COUNT(*) FROM session_analysis_results")
-            stats["total_analysis"] = cursor.fetchone()[0]
-
-        # Last updated
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT MAX(last_updated) FROM ingestion_state")
-            last_update = cursor.fetchone()[0]
+        with pool.connection() as conn:
+            # Counts and last update, precomputed by mv_dashboard_summary
+            rows = _fetch_read_model(
+                conn,
+                "SELECT total_sessions, total_analysis, last_updated FROM mv_dashboard_summary",
+                f"SELECT total_sessions, total_analysis, last_updated FROM ({DASHBOARD_SUMMARY_QUERY}) s",
+            )
+            row = rows[0] if rows else None
+            stats["total_sessions"], stats["total_analysis"], last_update = row or (0, 0, None)
             stats["last_updated"] = last_update if last_update else None
 
-        # Sessions by project
-        with conn.cursor() as cursor:
-            cursor.execute("""
-            SELECT projectid, COUNT(*) as count
-            FROM raw_session_metadata
-            WHERE projectid IS NOT NULL
-            GROUP BY projectid
-            ORDER BY count DESC
-            LIMIT 10
-            """)
-            stats["top_projects"] = cursor.fetchall()
+            # Sessions by project
+            stats["top_projects"] = _fetch_read_model(
+                conn,
+                """
+                SELECT projectid, count
+                FROM project_session_counts
+                WHERE count > 0
+                ORDER BY count DESC
+                LIMIT 10
+                """,
+                """
+                SELECT projectid, COUNT(*) AS count
+                FROM raw_session_metadata
+                WHERE projectid IS NOT NULL
+                GROUP BY projectid
+                ORDER BY count DESC
+                LIMIT 10
+                """,
+            )
 
         return stats
     except Exception as e:
         st.error(f"Error getting summary stats: {e}")
         return {}
-    finally:
-        return_connection(conn)
 
 
 def show_session_details():
@@ -191,10 +336,16 @@ def show_session_details():
         return
 
     # Session selector
-    session_options = sessions_df.apply(
-        lambda row: f"{row['session_id'][:8]}... - {row['title'][:50]}{'...' if len(row['title']) > 50 else ''}",
-        axis=1,
+    id_prefixes = sessions_df["session_id"].str.slice(0, 8)
+    titles = sessions_df["title"].fillna("")
+    session_options = (
+        id_prefixes
+        + "... - "
+        + titles.str.slice(0, 50)
+        + titles.str.len().gt(50).map({True: "...", False: ""})
     ).tolist()
+    # Built in reverse so the newest session wins when prefixes collide
+    id_by_prefix = dict(zip(id_prefixes[::-1], sessions_df["session_id"][::-1]))
 
     selected_session = st.selectbox(
         "Select a session to view details:",
@@ -206,9 +357,8 @@ def show_session_details():
     if selected_session:
         # Extract session_id from selection
         selected_id = selected_session.split(" - ")[0].replace("...", "")
-        # Find the full session_id
-        session_row = sessions_df[sessions_df["session_id"].str.startswith(selected_id)].iloc[0]
-        session_id = session_row["session_id"]
+        session_id = id_by_prefix[selected_id]
+        session_row = sessions_df[sessions_df["session_id"] == session_id].iloc[0]
 
         # Display session metadata
         st.subheader("📋 Session Metadata")
@@ -231,8 +381,7 @@ def show_session_details():
             st.markdown(f"**Lines Deleted:** {session_row.get('deletions', 'N/A')}")
 
         # Load analysis data for this session
-        analysis_df = load_analysis_data()
-        session_analysis = analysis_df[analysis_df["session_id"] == session_id]
+        session_analysis = load_session_analysis(session_id)
 
         if not session_analysis.empty:
             st.subheader("📊 Analysis Metrics")
@@ -247,36 +396,26 @@ def show_session_details():
 
                 # Create metrics display
                 metrics = []
-                for _, row in type_data.iterrows():
-                    metric_name = row["metric_name"]
-                    try:
-                        metric_value = json.loads(row["metric_value"])
-                    except:
-                        metric_value = row["metric_value"]
-
+                for metric_name, metric_value in zip(
+                    type_data["metric_name"], type_data["metric_value"]
+                ):
                     metrics.append(f"- **{metric_name.replace('_', ' ').title()}:** {metric_value}")
 
                 st.markdown("\n".join(metrics))
 
                 # Simple bar chart for numeric metrics
-                numeric_metrics = type_data[
-                    type_data["metric_value"].astype(str).str.match(r"^\d+(\.\d+)?$")
-                ]
-                if not numeric_metrics.empty:
-                    chart_data = numeric_metrics.copy()
-                    chart_data["metric_value"] = pd.to_numeric(
-                        chart_data["metric_value"], errors="coerce"
+                chart_data = type_data.assign(
+                    metric_value=pd.to_numeric(type_data["metric_value"], errors="coerce")
+                ).dropna(subset=["metric_value"])
+
+                if not chart_data.empty:
+                    fig = px.bar(
+                        chart_data,
+                        x="metric_name",
+                        y="metric_value",
+                        title=f"{analysis_type.replace('_', ' ').title()} Metrics",
                     )
-                    chart_data = chart_data.dropna()
-
-                    if not chart_data.empty:
-                        fig = px.bar(
-                            chart_data,
-                            x="metric_name",
-                            y="metric_value",
-                            title=f"{analysis_type.replace('_', ' ').title()} Metrics",
-                        )
-                        st.plotly_chart(fig, width="stretch")
+                    st.plotly_chart(fig, width="stretch")
         else:
             st.info("No analysis data available for this session")
 
@@ -350,10 +489,9 @@ def show_overview():
 def show_sessions_browser():
     st.header("🔍 Sessions Browser")
 
-    # Load data
-    df = load_sessions_data()
+    first_created, last_created = get_session_date_bounds()
 
-    if df.empty:
+    if first_created is None:
         st.error("No session data available")
         return
 
@@ -363,25 +501,22 @@ def show_sessions_browser():
     with col1:
         date_range = st.date_input(
             "Date Range",
-            value=(df["created_at"].min().date(), df["created_at"].max().date()),
+            value=(first_created.date(), last_created.date()),
             key="date_filter",
         )
 
     with col2:
         search_term = st.text_input("Search titles", "", key="search_filter")
 
-    # Apply filters
-    filtered_df = df.copy()
+    # Filters are applied in SQL
+    start = end = None
     if len(date_range) == 2:
-        filtered_df = filtered_df[
-            (filtered_df["created_at"].dt.date >= date_range[0])
-            & (filtered_df["created_at"].dt.date <= date_range[1])
-        ]
+        start = datetime.combine(date_range[0], datetime.min.time())
+        end = datetime.combine(date_range[1], datetime.min.time()) + timedelta(days=1)
 
-    if search_term:
-        filtered_df = filtered_df[
-            filtered_df["title"].str.contains(search_term, case=False, na=False)
-        ]
+    filtered_df = load_sessions_data(start, end, search_term or None)
+    if filtered_df.columns.empty:
+        return  # Load failed, error already shown
 
     # Display table
     st.dataframe(
@@ -400,18 +535,24 @@ def show_sessions_browser():
         },
     )
 
-    st.caption(f"Showing {len(filtered_df)} of {len(df)} sessions")
+    total_sessions = get_summary_stats().get("total_sessions", len(filtered_df))
+    st.caption(f"Showing {len(filtered_df)} of {total_sessions} sessions")
+    if len(filtered_df) == SESSIONS_BROWSER_LIMIT:
+        st.caption(f"Results are limited to the {SESSIONS_BROWSER_LIMIT:,} most recent matches")
 
-    # Export button
+    # Export button; the CSV is only encoded once the user asks for it
     if not filtered_df.empty:
-        csv = filtered_df.to_csv(index=False)
-        st.download_button(
-            label="📥 Download Filtered Data as CSV",
-            data=csv,
-            file_name="filtered_sessions.csv",
-            mime="text/csv",
-            key="download_csv",
-        )
+        filters = (start, end, search_term or None)
+        if st.button("📄 Prepare CSV Export", key="prepare_csv"):
+            st.session_state["csv_filters"] = filters
+        if st.session_state.get("csv_filters") == filters:
+            st.download_button(
+                label="📥 Download Filtered Data as CSV",
+                data=encode_sessions_csv(*filters),
+                file_name="filtered_sessions.csv",
+                mime="text/csv",
+                key="download_csv",
+            )
 
 
 def show_analytics():
@@ -428,9 +569,12 @@ def show_analytics():
     # Basic metrics over time
     st.subheader("📅 Sessions Over Time")
 
-    # Group by date
-    sessions_df["date"] = sessions_df["created_at"].dt.date
-    daily_sessions = sessions_df.groupby("date").size().reset_index(name="count")
+    # Group by day, flooring timestamps instead of building datetime.date objects
+    daily_sessions = (
+        sessions_df.groupby(sessions_df["created_at"].dt.floor("D").rename("date"))
+        .size()
+        .reset_index(name="count")
+    )
 
     fig = px.line(daily_sessions, x="date", y="count", title="Daily Session Count", markers=True)
     st.plotly_chart(fig, use_container_width=True)
@@ -438,19 +582,29 @@ def show_analytics():
     # Activity metrics distribution
     st.subheader("📈 Activity Metrics Distribution")
 
-    col1, col2, col3 = st.columns(3)
-
-    with col1:
-        fig = px.histogram(sessions_df, x="files", title="Files Changed Distribution", nbins=20)
-        st.plotly_chart(fig, width="stretch")
-
-    with col2:
-        fig = px.histogram(sessions_df, x="additions", title="Lines Added Distribution", nbins=20)
-        st.plotly_chart(fig, width="stretch")
-
-    with col3:
-        fig = px.histogram(sessions_df, x="deletions", title="Lines Deleted Distribution", nbins=20)
-        st.plotly_chart(fig, width="stretch")
+    # Histograms are binned with numpy and drawn as one figure
+    distributions = [
+        ("files", "Files Changed Distribution"),
+        ("additions", "Lines Added Distribution"),
+        ("deletions", "Lines Deleted Distribution"),
+    ]
+    fig = make_subplots(rows=1, cols=len(distributions), subplot_titles=[t for _, t in distributions])
+    for col, (column, title) in enumerate(distributions, start=1):
+        counts, edges = np.histogram(sessions_df[column].dropna().to_numpy(dtype=float), bins=20)
+        fig.add_trace(
+            go.Bar(
+                x=(edges[:-1] + edges[1:]) / 2,
+                y=counts,
+                width=np.diff(edges),
+                name=title,
+                showlegend=False,
+            ),
+            row=1,
+            col=col,
+        )
+        fig.update_xaxes(title_text=column, row=1, col=col)
+    fig.update_yaxes(title_text="count", row=1, col=1)
+    st.plotly_chart(fig, width="stretch")
 
 
 def main():
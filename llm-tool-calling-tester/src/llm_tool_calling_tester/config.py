@@ -4,6 +4,9 @@ from typing import Final
 API_BASE_URL: Final[str] = os.getenv("MODEL_TESTER_API_URL", "http://localhost:8317/v1")
 TIMEOUT_SECONDS: Final[int] = int(os.getenv("MODEL_TESTER_TIMEOUT", "30"))
 MAX_WORKERS: Final[int] = int(os.getenv("MODEL_TESTER_MAX_WORKERS", "5"))
+MAX_CONCURRENT_REQUESTS: Final[int] = int(
+    os.getenv("MODEL_TESTER_MAX_CONCURRENT_REQUESTS", "10")
+)
 MAX_RETRIES: Final[int] = 2
 RETRY_DELAY: Final[float] = 1.0
 
@@ -31,3 +34,7 @@ AUTONOMOUS_AGENT_WEIGHTS: Final[dict[str, float]] = {
     "json_mode": 0.10,
     "streaming_tool_calls": 0.05,
 }
+
+AUTONOMOUS_AGENT_WEIGHTS_ITEMS: Final[tuple[tuple[str, float], ...]] = tuple(
+    AUTONOMOUS_AGENT_WEIGHTS.items()
+)
@@ -1,16 +1,18 @@
 import argparse
 import json
 import os
+import re
 import asyncio
 import httpx
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Optional
-from tqdm import tqdm
+from tqdm.asyncio import tqdm
 import time
 
 from .tester import ModelTester
-from .models import ModelTestResults, TestResult, TestStatus, FullReport, TestSummary
+from .serialization import dumps_pretty, loads
+from .models import ModelTestResults, TestResult, TestStatus, TestSummary
 from .config import (
     API_BASE_URL,
     TIMEOUT_SECONDS,
@@ -18,6 +20,7 @@ from .config import (
     OUTPUT_DIR,
     RECOMMENDATION_THRESHOLDS,
     AUTONOMOUS_AGENT_WEIGHTS,
+    AUTONOMOUS_AGENT_WEIGHTS_ITEMS,
 )
 
 
@@ -32,38 +35,35 @@ class ModelTestRunner:
         self.api_url = api_url
         self.max_workers = max_workers
         self.filter_pattern = filter_pattern
+        self._filter_re = re.compile(filter_pattern) if filter_pattern else None
         self.quick_mode = quick_mode
         self.tester = ModelTester(api_url)
 
-    async def fetch_models(self) -> List[dict]:
+    async def fetch_models(
+        self, client: Optional[httpx.AsyncClient] = None
+    ) -> List[dict]:
         try:
-            async with httpx.AsyncClient(timeout=TIMEOUT_SECONDS) as client:
-                response = await client.get(f"{self.api_url}/models")
-                response.raise_for_status()
-                data = response.json()
-                return data.get("data", [])
+            if client is None:
+                async with httpx.AsyncClient(timeout=TIMEOUT_SECONDS) as client:
+                    return await self._get_models(client)
+            return await self._get_models(client)
         except Exception as e:
             print(f"Failed to fetch models: {str(e)}")
             return []
 
-    def filter_models(self, models: List[dict]) -> List[dict]:
-        filtered_models = []
-
-        for model in models:
-            model_id = model.get("id", "")
-
-            if "gpt" in model_id.lower():
-                continue
-
-            if self.filter_pattern:
-                import re
-
-                if re.search(self.filter_pattern, model_id):
-                    filtered_models.append(model)
-            else:
-                filtered_models.append(model)
+    async def _get_models(self, client: httpx.AsyncClient) -> List[dict]:
+        response = await client.get(f"{self.api_url}/models")
+        response.raise_for_status()
+        data = loads(response.content)
+        return data.get("data", [])
 
-        return filtered_models
+    def filter_models(self, models: List[dict]) -> List[dict]:
+        return [
+            model
+            for model in models
+            if "gpt" not in model.get("id", "").lower()
+            and (self._filter_re is None or self._filter_re.search(model.get("id", "")))
+        ]
 
     def calculate_score(self, tests: dict[str, TestResult]) -> float:
         if self.quick_mode:
@@ -73,9 +73,8 @@ class ModelTestRunner:
             return 0.0
 
         score = 0.0
-        test_names = list(AUTONOMOUS_AGENT_WEIGHTS.keys())
 
-        for test_name, weight in AUTONOMOUS_AGENT_WEIGHTS.items():
+        for test_name, weight in AUTONOMOUS_AGENT_WEIGHTS_ITEMS:
             if test_name in tests:
                 test = tests[test_name]
                 if test.status == TestStatus.PASSED:
@@ -94,39 +93,41 @@ class ModelTestRunner:
     async def test_model(self, model: dict) -> Optional[ModelTestResults]:
         model_id = model.get("id", "unknown")
         owned_by = model.get("owned_by", "unknown")
+        tests = await self.run_model_tests(model_id, owned_by)
+        return self.build_result(model_id, owned_by, tests)
 
+    async def run_model_tests(
+        self, model_id: str, owned_by: str
+    ) -> dict[str, TestResult]:
         print(f"\n⚪ Testing: {model_id} ({owned_by})")
 
         if self.quick_mode:
             basic_test = await self.tester.test_basic_tool_calling(model_id)
+            return {"basic_tool_calling": basic_test}
+        return await self.tester.run_all_tests(model_id, owned_by)
+
+    def build_result(
+        self, model_id: str, owned_by: str, tests: dict[str, TestResult]
+    ) -> Optional[ModelTestResults]:
+        if self.quick_mode:
+            basic_test = tests["basic_tool_calling"]
             if basic_test.status == TestStatus.SKIPPED:
                 print(f"  ⏭️ Skipped: {basic_test.error_message}")
                 return None
-            tests = {"basic_tool_calling": basic_test}
         else:
-            tests = await self.tester.run_all_tests(model_id, owned_by)
-            if any(test.status == TestStatus.SKIPPED for test in tests.values()):
-                skipped_msg = next(
-                    (
-                        t.error_message
-                        for t in tests.values()
-                        if t.status == TestStatus.SKIPPED
-                    ),
-                    "Model not available",
-                )
-                print(f"  ⏭️ Skipped: {skipped_msg}")
+            first_skip = first_err = None
+            for test in tests.values():
+                if first_skip is None and test.status is TestStatus.SKIPPED:
+                    first_skip = test
+                elif first_err is None and test.status is TestStatus.ERROR:
+                    first_err = test
+
+            if first_skip is not None:
+                print(f"  ⏭️ Skipped: {first_skip.error_message or 'Model not available'}")
                 return None
 
-            if any(test.status == TestStatus.ERROR for test in tests.values()):
-                error_msg = next(
-                    (
-                        t.error_message
-                        for t in tests.values()
-                        if t.status == TestStatus.ERROR
-                    ),
-                    "Unknown error",
-                )
-                print(f"  ⚠️ Error: {error_msg}")
+            if first_err is not None:
+                print(f"  ⚠️ Error: {first_err.error_message or 'Unknown error'}")
                 return None
 
         score = self.calculate_score(tests)
@@ -138,7 +139,7 @@ class ModelTestRunner:
             if test.status != TestStatus.SKIPPED
         )
 
-        return ModelTestResults(
+        result = ModelTestResults(
             model_id=model_id,
             owned_by=owned_by,
             tests=tests,
@@ -147,9 +148,16 @@ class ModelTestRunner:
             total_latency_ms=total_latency,
             is_gpt_model=False,
         )
+        result.cached_dump()
+        return result
 
     async def run_tests(self) -> List[ModelTestResults]:
-        models = await self.fetch_models()
+        # The tester's pooled client serves the model listing and every test request
+        async with self.tester:
+            return await self._run_tests()
+
+    async def _run_tests(self) -> List[ModelTestResults]:
+        models = await self.fetch_models(self.tester.client)
 
         if not models:
             print("No models found to test")
@@ -161,21 +169,47 @@ class ModelTestRunner:
         if self.quick_mode:
             print("Quick mode: Only testing basic tool calling")
 
-        results = []
+        pairs = [
+            (model.get("id", "unknown"), model.get("owned_by", "unknown"))
+            for model in filtered_models
+        ]
 
-        for model in tqdm(filtered_models, desc="Testing models"):
-            result = await self.test_model(model)
-            if result:
-                results.append(result)
+        built: dict[str, Optional[ModelTestResults]] = {}
 
-        return results
+        with tqdm(total=len(pairs), desc="Testing models") as progress:
+
+            async def run_one(model_id: str, owned_by: str) -> dict[str, TestResult]:
+                try:
+                    tests = await self.run_model_tests(model_id, owned_by)
+                    built[model_id] = self.build_result(model_id, owned_by, tests)
+                    return tests
+                finally:
+                    progress.update(1)
+
+            # The tester's pool shrinks its concurrency when models get rate limited
+            await self.tester.run_for_models(
+                pairs, concurrency=self.max_workers, run_tests=run_one
+            )
+
+        results = (built.get(model_id) for model_id, _ in pairs)
+        return [result for result in results if result]
 
     def generate_summary(self, results: List[ModelTestResults]) -> TestSummary:
-        recommended = [r.model_id for r in results if r.recommendation == "recommended"]
-        partial = [r.model_id for r in results if r.recommendation == "partial_support"]
-        no_tool = [r.model_id for r in results if r.recommendation == "no_tool_calling"]
+        by_recommendation: dict[str, list[str]] = {
+            "recommended": [],
+            "partial_support": [],
+            "no_tool_calling": [],
+        }
+        for r in results:
+            by_recommendation[r.recommendation].append(r.model_id)
+        recommended = by_recommendation["recommended"]
+        partial = by_recommendation["partial_support"]
+        no_tool = by_recommendation["no_tool_calling"]
 
         gpt_summary = {}
+        timestamp = (
+            datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+        )
 
         test_stats = {
             "total": len(results),
@@ -186,7 +220,7 @@ class ModelTestRunner:
         }
 
         return TestSummary(
-            timestamp=datetime.utcnow().isoformat() + "Z",
+            timestamp=timestamp,
             api_endpoint=self.api_url,
             total_models=len(results),
             tested_models=len([r for r in results if r.tests]),
@@ -200,6 +234,8 @@ class ModelTestRunner:
     def print_console_summary(
         self, summary: TestSummary, results: List[ModelTestResults]
     ):
+        by_id = {r.model_id: r for r in results}
+
         print("\n" + "=" * 80)
         print(f"MODEL TESTING RESULTS ({summary.total_models} models tested)")
         print("=" * 80)
@@ -208,7 +244,7 @@ class ModelTestRunner:
             f"\n✅ Recommended for Autonomous Agent ({len(summary.recommended)} models):"
         )
         for model_id in summary.recommended:
-            result = next(r for r in results if r.model_id == model_id)
+            result = by_id[model_id]
             tests_str = ", ".join(
                 [
                     f"{k}:{'✓' if v.status == TestStatus.PASSED else '✗'}"
@@ -220,7 +256,7 @@ class ModelTestRunner:
 
         print(f"\n⚠️ Partial Support ({len(summary.partial_support)} models):")
         for model_id in summary.partial_support[:5]:
-            result = next(r for r in results if r.model_id == model_id)
+            result = by_id[model_id]
             tests_str = ", ".join(
                 [
                     f"{k}:{'✓' if v.status == TestStatus.PASSED else '✗'}"
@@ -247,7 +283,7 @@ class ModelTestRunner:
 
         print("\n💡 Recommendations for Autonomous Research Agent:")
         top_models = sorted(
-            [r for r in results if r.recommendation == "recommended"],
+            [r for r in by_id.values() if r.recommendation == "recommended"],
             key=lambda x: x.overall_score,
             reverse=True,
         )[:3]
@@ -261,21 +297,24 @@ class ModelTestRunner:
 
     def save_json_report(self, summary: TestSummary, results: List[ModelTestResults]):
         os.makedirs(OUTPUT_DIR, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Name the file after the summary timestamp (in local time) so the two agree
+        generated_at = datetime.fromisoformat(summary.timestamp.replace("Z", "+00:00"))
+        timestamp = generated_at.astimezone().strftime("%Y%m%d_%H%M%S")
         filename = f"{OUTPUT_DIR}/model_capabilities_{timestamp}.json"
 
-        report = FullReport(
-            summary=summary,
-            results=results,
-            metadata={
+        # Same layout as FullReport, reusing each result's cached dump
+        report = {
+            "summary": summary.model_dump(mode="json"),
+            "results": [r.cached_dump() for r in results],
+            "metadata": {
                 "api_url": self.api_url,
                 "quick_mode": str(self.quick_mode),
                 "test_weights": str(AUTONOMOUS_AGENT_WEIGHTS),
             },
-        )
+        }
 
-        with open(filename, "w") as f:
-            f.write(report.model_dump_json(indent=2))
+        with open(filename, "wb") as f:
+            f.write(dumps_pretty(report))
 
         print(f"\n📄 Full report saved to: {filename}")
 
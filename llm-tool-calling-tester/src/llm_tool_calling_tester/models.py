@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from typing import Optional, Literal
 from datetime import datetime
 from enum import Enum
@@ -27,6 +27,13 @@ class ModelTestResults(BaseModel):
     recommendation: Literal["recommended", "partial_support", "no_tool_calling"]
     total_latency_ms: int
     is_gpt_model: bool = False
+    _dump_cache: Optional[dict] = PrivateAttr(default=None)
+
+    def cached_dump(self) -> dict:
+        """JSON-mode dump, computed once; results are not modified after testing."""
+        if self._dump_cache is None:
+            self._dump_cache = self.model_dump(mode="json")
+        return self._dump_cache
 
 
 class ToolDefinition(BaseModel):
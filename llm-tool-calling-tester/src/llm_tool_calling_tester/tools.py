@@ -1,10 +1,11 @@
-from typing import List
-from .models import ToolDefinition
+from functools import cache, lru_cache
+from types import MappingProxyType
+from .serialization import dumps, dumps_bytes
 
 
-WEATHER_TOOL: ToolDefinition = ToolDefinition(
-    type="function",
-    function={
+WEATHER_TOOL: dict = {
+    "type": "function",
+    "function": {
         "name": "get_weather",
         "description": "Get the current weather for a city",
         "parameters": {
@@ -20,12 +21,12 @@ WEATHER_TOOL: ToolDefinition = ToolDefinition(
             "required": ["city"],
         },
     },
-)
+}
 
 
-CALCULATOR_TOOL: ToolDefinition = ToolDefinition(
-    type="function",
-    function={
+CALCULATOR_TOOL: dict = {
+    "type": "function",
+    "function": {
         "name": "calculate",
         "description": "Perform mathematical calculations",
         "parameters": {
@@ -39,12 +40,12 @@ CALCULATOR_TOOL: ToolDefinition = ToolDefinition(
             "required": ["expression"],
         },
     },
-)
+}
 
 
-SEARCH_TOOL: ToolDefinition = ToolDefinition(
-    type="function",
-    function={
+SEARCH_TOOL: dict = {
+    "type": "function",
+    "function": {
         "name": "search_web",
         "description": "Search the web for information",
         "parameters": {
@@ -60,15 +61,21 @@ SEARCH_TOOL: ToolDefinition = ToolDefinition(
             "required": ["query"],
         },
     },
-)
+}
 
 
-def get_test_tools() -> List[ToolDefinition]:
-    return [WEATHER_TOOL, CALCULATOR_TOOL, SEARCH_TOOL]
+@lru_cache(maxsize=1)
+def get_test_tools() -> tuple[dict, ...]:
+    return (WEATHER_TOOL, CALCULATOR_TOOL, SEARCH_TOOL)
 
 
-def get_mock_tool_response(tool_name: str) -> dict:
-    responses = {
+@lru_cache(maxsize=1)
+def get_test_tools_json() -> bytes:
+    return dumps_bytes(list(get_test_tools()))
+
+
+_RESPONSES = MappingProxyType(
+    {
         "get_weather": {
             "temperature": 22,
             "condition": "partly cloudy",
@@ -91,4 +98,15 @@ def get_mock_tool_response(tool_name: str) -> dict:
             ]
         },
     }
-    return responses.get(tool_name, {"result": "mock response"})
+)
+
+
+@cache
+def get_mock_tool_response(tool_name: str) -> dict:
+    # Shared across callers; treat the returned dict as read-only
+    return _RESPONSES.get(tool_name, {"result": "mock response"})
+
+
+@cache
+def get_mock_tool_response_json(tool_name: str) -> str:
+    return dumps(get_mock_tool_response(tool_name))
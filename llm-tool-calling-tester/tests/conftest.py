@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The package is not installed; import it from src/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,165 @@
+import asyncio
+
+import httpx
+
+from llm_tool_calling_tester.tester import ModelTester, _has_tool_calls_delta
+from llm_tool_calling_tester.serialization import dumps_bytes
+
+
+def _sse_event(delta: dict) -> bytes:
+    return b"data: " + dumps_bytes({"choices": [{"delta": delta}]}) + b"\n\n"
+
+
+class CountingStream(httpx.AsyncByteStream):
+    """SSE body delivered one event at a time, recording how much was read."""
+
+    def __init__(self, events: list[bytes]):
+        self.events = events
+        self.bytes_sent = 0
+        self.closed = False
+
+    async def __aiter__(self):
+        for event in self.events:
+            self.bytes_sent += len(event)
+            yield event
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+def test_streaming_early_stop_leaves_before_eof():
+    events = [_sse_event({"role": "assistant"})]
+    events.append(
+        _sse_event(
+            {
+                "tool_calls": [
+                    {"index": 0, "id": "call_1", "function": {"name": "get_weather"}}
+                ]
+            }
+        )
+    )
+    events.extend(_sse_event({"content": "x" * 64}) for _ in range(100))
+    events.append(b"data: [DONE]\n\n")
+    body = CountingStream(events)
+    total = sum(len(e) for e in events)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, stream=body)
+
+    async def run() -> dict:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with ModelTester("http://test/v1", client=client) as tester:
+            return await tester.chat_completion(
+                {"model": "m", "messages": [], "stream": True},
+                stream=True,
+                early_stop=_has_tool_calls_delta,
+            )
+
+    response = asyncio.run(run())
+
+    assert len(response["chunks"]) == 2
+    assert _has_tool_calls_delta(response["chunks"][-1])
+    assert body.bytes_sent < total // 10
+    assert body.closed
+
+
+def _weather_handler(calls: list):
+    tool_call = {
+        "id": "call_1",
+        "type": "function",
+        "function": {"name": "get_weather", "arguments": '{"city": "Tokyo"}'},
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(
+            200,
+            json={
+                "choices": [
+                    {"message": {"role": "assistant", "tool_calls": [tool_call]}}
+                ]
+            },
+        )
+
+    return handler
+
+
+def test_basic_test_outside_run_all_tests_keeps_no_first_call():
+    calls: list = []
+
+    async def run() -> ModelTester:
+        transport = httpx.MockTransport(_weather_handler(calls))
+        client = httpx.AsyncClient(transport=transport)
+        async with ModelTester("http://test/v1", client=client) as tester:
+            await tester.test_basic_tool_calling("m")
+            return tester
+
+    tester = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert tester._first_call_cache == {}
+
+
+def test_run_for_models_retires_a_slot_after_rate_limit():
+    active = 0
+    peak_after_limit = 0
+    limited_done = False
+
+    async def run() -> list:
+        tester = ModelTester("http://test/v1", client=httpx.AsyncClient())
+        request = httpx.Request("POST", "http://test/v1/chat/completions")
+        rate_limited = httpx.HTTPStatusError(
+            "429", request=request, response=httpx.Response(429, request=request)
+        )
+
+        async def run_tests(model: str, owned_by: str) -> dict:
+            nonlocal active, peak_after_limit, limited_done
+            active += 1
+            if limited_done:
+                peak_after_limit = max(peak_after_limit, active)
+            if model == "limited":
+                # Finishes mid-batch, while the other models are queued
+                await asyncio.sleep(0.025)
+                limited_done = True
+                active -= 1
+                result = tester._classify_exception(rate_limited, "basic_tool_calling", 0)
+                return {"basic_tool_calling": result}
+            await asyncio.sleep(0.01)
+            active -= 1
+            return {}
+
+        models = [(f"m{i}", "o") for i in range(20)]
+        models[1] = ("limited", "o")
+        async with tester:
+            return await tester.run_for_models(
+                models, concurrency=3, run_tests=run_tests
+            )
+
+    results = asyncio.run(run())
+
+    assert len(results) == 20
+    assert peak_after_limit == 2
+
+
+def test_latency_excludes_wait_for_a_request_slot():
+    calls: list = []
+    respond = _weather_handler(calls)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.05)
+        return respond(request)
+
+    async def run() -> list:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with ModelTester("http://test/v1", client=client) as tester:
+            # One slot: the second test queues behind the first request
+            tester._request_slots = asyncio.Semaphore(1)
+            return await asyncio.gather(
+                tester.test_basic_tool_calling("a"),
+                tester.test_basic_tool_calling("b"),
+            )
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 2
+    assert all(50 <= r.latency_ms < 90 for r in results)